@@ -60,9 +60,20 @@ def generate_test_data(paths: str) -> str:
     os.makedirs(train_mask_dir, exist_ok=True)
     os.makedirs(test_field_dir, exist_ok=True)
 
-    source_unique_folder_ids = ['32407', '8641e', 'a419f', 'eac11', 'ff450']
-    train_folder_ids = source_unique_folder_ids[0:5]
-    test_folder_ids = source_unique_folder_ids[3:5]
+    source_unique_folder_ids = [
+        '0b3d1',
+        '1c5a2',
+        '32407',
+        '5e7f9',
+        '8641e',
+        '9d2c4',
+        'a419f',
+        'c6b8e',
+        'eac11',
+        'ff450',
+    ]
+    train_folder_ids = source_unique_folder_ids[0:10]
+    test_folder_ids = source_unique_folder_ids[8:10]
 
     for id in source_unique_folder_ids:
         directory = os.path.join(
@@ -1,7 +1,13 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License.
 
+import copy
+import json
+import multiprocessing
 import os
+import pickle
+import shutil
+from multiprocessing.shared_memory import SharedMemory
 from pathlib import Path
 
 import matplotlib.pyplot as plt
@@ -9,6 +15,7 @@ import pytest
 import torch
 import torch.nn as nn
 from rasterio.crs import CRS
+from torch.utils.data import DataLoader
 
 from torchgeo.datasets import (
     AgriFieldNet,
@@ -17,13 +24,16 @@ from torchgeo.datasets import (
     IntersectionDataset,
     RGBBandsMissingError,
     UnionDataset,
+    stack_samples,
 )
 
 
 class TestAgriFieldNet:
     @pytest.fixture
-    def dataset(self) -> AgriFieldNet:
-        path = os.path.join('tests', 'data', 'agrifieldnet')
+    def dataset(self, tmp_path: Path) -> AgriFieldNet:
+        # Copy the data since some tests write a label cache next to it
+        path = os.path.join(tmp_path, 'agrifieldnet')
+        shutil.copytree(os.path.join('tests', 'data', 'agrifieldnet'), path)
         transforms = nn.Identity()
         return AgriFieldNet(paths=path, transforms=transforms)
 
@@ -33,6 +43,284 @@ class TestAgriFieldNet:
         assert isinstance(x['crs'], CRS)
         assert isinstance(x['image'], torch.Tensor)
         assert isinstance(x['mask'], torch.Tensor)
+        assert x['mask'].dtype == torch.long
+
+    def test_classes(self, dataset: AgriFieldNet) -> None:
+        ds = AgriFieldNet(dataset.paths, classes=[0, 1, 2])
+        x = ds[ds.bounds]
+        assert x['mask'].dtype == torch.long
+        assert x['mask'].max() < 3
+
+    def test_cache_samples(self, dataset: AgriFieldNet) -> None:
+        ds = AgriFieldNet(dataset.paths, cache_samples=True)
+        x = ds[ds.bounds]
+        x['image'] += 1
+        x['mask'] += 1
+        y = ds[ds.bounds]
+        z = dataset[dataset.bounds]
+        assert torch.equal(y['image'], z['image'])
+        assert torch.equal(y['mask'], z['mask'])
+
+    def test_cache_samples_rebuild(self, dataset: AgriFieldNet) -> None:
+        ds = AgriFieldNet(dataset.paths, cache_samples=True)
+        ds[ds.bounds]
+        assert isinstance(ds.paths, str)
+        shutil.rmtree(os.path.join(ds.paths, 'train_labels'))
+        ds._rebuild_cache()
+        x = ds[ds.bounds]
+        assert torch.all(x['mask'] == 0)
+
+    def test_no_cache(self, dataset: AgriFieldNet) -> None:
+        ds = AgriFieldNet(dataset.paths, cache=False)
+        x = ds[ds.bounds]
+        y = dataset[dataset.bounds]
+        assert torch.equal(x['image'], y['image'])
+        assert torch.equal(x['mask'], y['mask'])
+
+    def test_no_labels(self, dataset: AgriFieldNet) -> None:
+        dataset._mask_bounds = dataset._mask_bounds[:0]
+        x = dataset[dataset.bounds]
+        assert x['mask'].shape == x['image'].shape[-2:]
+        assert torch.all(x['mask'] == 0)
+
+    @pytest.mark.parametrize('dtype', [torch.float16, torch.bfloat16])
+    def test_dtype(self, dataset: AgriFieldNet, dtype: torch.dtype) -> None:
+        ds = AgriFieldNet(dataset.paths, dtype=dtype)
+        assert ds.dtype == dtype
+        x = ds[ds.bounds]
+        assert x['image'].dtype == dtype
+        ds.plot(x)
+        plt.close()
+
+    def test_find_mask_filepaths(self, dataset: AgriFieldNet) -> None:
+        assert isinstance(dataset.paths, str)
+        label_dir = os.path.join(dataset.paths, 'train_labels')
+        nested = os.path.join(label_dir, 'nested')
+        os.makedirs(nested)
+        for filename in os.listdir(label_dir):
+            if filename.endswith('.tif'):
+                shutil.copy(os.path.join(label_dir, filename), nested)
+        filepaths, mtimes = dataset._find_mask_filepaths(label_dir)
+        assert len(filepaths) == 2 * len(dataset._mask_filepaths)
+        assert not [fp for fp in filepaths if fp.endswith('_field_ids.tif')]
+        assert set(mtimes) == {label_dir, nested}
+        missing = os.path.join(label_dir, 'missing')
+        assert dataset._find_mask_filepaths(missing) == ([], {})
+
+    def test_label_cache_disabled(self, dataset: AgriFieldNet) -> None:
+        assert isinstance(dataset.paths, str)
+        assert dataset.label_cache_filename not in os.listdir(dataset.paths)
+
+    def test_label_cache(
+        self, dataset: AgriFieldNet, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        assert isinstance(dataset.paths, str)
+        AgriFieldNet(dataset.paths, cache_labels=True)
+        cache_path = os.path.join(dataset.paths, dataset.label_cache_filename)
+        assert os.path.exists(cache_path)
+
+        def walk(*args: str) -> tuple[list[str], dict[str, int]]:
+            raise AssertionError('label tree should not be walked')
+
+        monkeypatch.setattr(AgriFieldNet, '_find_mask_filepaths', walk)
+        ds = AgriFieldNet(dataset.paths, cache_labels=True)
+        assert ds._mask_filepaths == dataset._mask_filepaths
+        assert (ds._mask_bounds == dataset._mask_bounds).all()
+
+    def test_label_cache_stale(self, dataset: AgriFieldNet) -> None:
+        assert isinstance(dataset.paths, str)
+        AgriFieldNet(dataset.paths, cache_labels=True)
+        label_dir = os.path.join(dataset.paths, 'train_labels')
+        os.remove(os.path.join(label_dir, os.listdir(label_dir)[0]))
+        ds = AgriFieldNet(dataset.paths, cache_labels=True)
+        assert len(ds._mask_filepaths) == len(dataset._mask_filepaths) - 1
+
+    def test_label_cache_stale_nested(self, dataset: AgriFieldNet) -> None:
+        assert isinstance(dataset.paths, str)
+        label_dir = os.path.join(dataset.paths, 'train_labels')
+        nested = os.path.join(label_dir, 'nested')
+        os.makedirs(nested)
+        AgriFieldNet(dataset.paths, cache_labels=True)
+        filename = dataset._mask_filepaths[0]
+        shutil.copy(filename, nested)
+        # Only the nested directory changes
+        mtime = os.stat(label_dir).st_mtime_ns
+        ds = AgriFieldNet(dataset.paths, cache_labels=True)
+        assert os.stat(label_dir).st_mtime_ns == mtime
+        assert len(ds._mask_filepaths) == len(dataset._mask_filepaths) + 1
+
+    def test_label_cache_missing_dir(self, dataset: AgriFieldNet) -> None:
+        assert isinstance(dataset.paths, str)
+        AgriFieldNet(dataset.paths, cache_labels=True)
+        shutil.rmtree(os.path.join(dataset.paths, 'train_labels'))
+        ds = AgriFieldNet(dataset.paths, cache_labels=True)
+        assert ds._mask_filepaths == []
+
+    def test_label_cache_invalid(self, dataset: AgriFieldNet) -> None:
+        assert isinstance(dataset.paths, str)
+        cache_path = os.path.join(dataset.paths, dataset.label_cache_filename)
+        with open(cache_path, 'w') as f:
+            f.write('not json')
+        ds = AgriFieldNet(dataset.paths, cache_labels=True)
+        assert ds._mask_filepaths == dataset._mask_filepaths
+        with open(cache_path) as f:
+            assert json.load(f)['crs'] == ds.crs.to_wkt()
+
+    def test_label_cache_crs(self, dataset: AgriFieldNet) -> None:
+        AgriFieldNet(dataset.paths, cache_labels=True)
+        crs = CRS.from_epsg(4326)
+        ds = AgriFieldNet(dataset.paths, crs=crs, cache_labels=True)
+        assert not (ds._mask_bounds == dataset._mask_bounds).all()
+
+    def test_label_cache_read_only(
+        self, dataset: AgriFieldNet, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        def replace(*args: str) -> None:
+            raise PermissionError
+
+        monkeypatch.setattr(os, 'replace', replace)
+        ds = AgriFieldNet(dataset.paths, cache_labels=True)
+        ds._rebuild_cache()
+        assert ds._mask_filepaths == dataset._mask_filepaths
+        assert isinstance(ds.paths, str)
+        assert not [f for f in os.listdir(ds.paths) if f.endswith('.tmp')]
+
+    def test_rebuild_cache(self, dataset: AgriFieldNet) -> None:
+        assert isinstance(dataset.paths, str)
+        label_dir = os.path.join(dataset.paths, 'train_labels')
+        os.remove(os.path.join(label_dir, os.listdir(label_dir)[0]))
+        n = len(dataset._mask_filepaths)
+        dataset._rebuild_cache()
+        assert len(dataset._mask_filepaths) == n - 1
+        assert len(dataset._mask_bounds) == n - 1
+
+    def test_shared_cache(self, dataset: AgriFieldNet) -> None:
+        ds = AgriFieldNet(dataset.paths, shared_cache=2**20)
+        x = ds[ds.bounds]
+        x['mask'] += 1
+        y = ds[ds.bounds]
+        z = dataset[dataset.bounds]
+        assert ds._sample_store is not None
+        assert len(ds._sample_store) == 1
+        assert torch.equal(y['image'], z['image'])
+        assert torch.equal(y['mask'], z['mask'])
+
+    def test_shared_cache_workers(self, dataset: AgriFieldNet) -> None:
+        ds = AgriFieldNet(dataset.paths, shared_cache=2**20)
+        sampler = [ds.bounds] * 4
+        dl = DataLoader(
+            ds, batch_size=2, sampler=sampler, num_workers=2, collate_fn=stack_samples
+        )
+        for batch in dl:
+            assert batch['image'].shape[0] == 2
+        assert ds._sample_store is not None
+        assert len(ds._sample_store) == 1
+
+    def test_shared_cache_spawn(self, dataset: AgriFieldNet) -> None:
+        ds = AgriFieldNet(dataset.paths, shared_cache=2**20)
+        ds[ds.bounds]
+        dl = DataLoader(
+            ds,
+            sampler=[ds.bounds],
+            num_workers=1,
+            collate_fn=stack_samples,
+            multiprocessing_context='spawn',
+        )
+        for batch in dl:
+            assert torch.equal(batch['image'][0], ds[ds.bounds]['image'])
+        assert ds._sample_store is not None
+        assert len(ds._sample_store) == 1
+
+    def test_shared_cache_deepcopy(self, dataset: AgriFieldNet) -> None:
+        ds = AgriFieldNet(dataset.paths, shared_cache=2**20)
+        ds2 = copy.deepcopy(ds)
+        assert ds2._sample_store is ds._sample_store
+
+    def test_close_deepcopy(self, dataset: AgriFieldNet) -> None:
+        ds = AgriFieldNet(dataset.paths, shared_cache=2**20)
+        ds2 = copy.deepcopy(ds)
+        ds2[ds2.bounds]
+        ds2.close()
+        assert ds._sample_store is not None
+        assert len(ds._sample_store) == 1
+        x = ds[ds.bounds]
+        y = dataset[dataset.bounds]
+        assert torch.equal(x['image'], y['image'])
+        assert torch.equal(x['mask'], y['mask'])
+
+    def test_shared_cache_rebuild(self, dataset: AgriFieldNet) -> None:
+        ds = AgriFieldNet(dataset.paths, shared_cache=2**20)
+        ds[ds.bounds]
+        ds._rebuild_cache()
+        assert ds._sample_store is not None
+        assert len(ds._sample_store) == 0
+
+    def test_close(self, dataset: AgriFieldNet) -> None:
+        ds = AgriFieldNet(dataset.paths, shared_cache=2**20)
+        ds[ds.bounds]
+        assert ds._sample_store is not None
+        name = ds._sample_store._arena.name
+        ds.close()
+        assert ds._sample_store is None
+        assert ds._io_pool is None
+        with pytest.raises(FileNotFoundError):
+            SharedMemory(name=name)
+        x = ds[ds.bounds]
+        assert isinstance(x['image'], torch.Tensor)
+        ds.close()
+
+    def test_len(self, dataset: AgriFieldNet) -> None:
+        # One index entry per tile, not per band
+        assert len(dataset) == 10
+
+    @pytest.mark.parametrize('num_threads', ['1', '2', 'ALL_CPUS'])
+    def test_num_threads(
+        self, dataset: AgriFieldNet, num_threads: str, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setenv('TORCHGEO_NUM_THREADS', num_threads)
+        ds = AgriFieldNet(dataset.paths)
+        x = ds[ds.bounds]
+        y = dataset[dataset.bounds]
+        assert torch.equal(x['image'], y['image'])
+        assert torch.equal(x['mask'], y['mask'])
+
+    @pytest.mark.skipif(
+        'fork' not in multiprocessing.get_all_start_methods(),
+        reason='requires fork start method',
+    )
+    def test_num_threads_fork(
+        self, dataset: AgriFieldNet, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setenv('TORCHGEO_NUM_THREADS', '2')
+        ds = AgriFieldNet(dataset.paths, cache=False)
+        # Create the thread pool in the parent before forking workers
+        ds[ds.bounds]
+        dl = DataLoader(
+            ds,
+            batch_size=2,
+            sampler=[ds.bounds] * 4,
+            num_workers=2,
+            collate_fn=stack_samples,
+            multiprocessing_context='fork',
+            timeout=20,
+        )
+        for batch in dl:
+            assert batch['image'].shape[0] == 2
+
+    def test_pickle(self, dataset: AgriFieldNet) -> None:
+        dataset[dataset.bounds]
+        ds = pickle.loads(pickle.dumps(dataset))
+        x = ds[ds.bounds]
+        assert isinstance(x['image'], torch.Tensor)
+
+    def test_pickle_shared_cache(self, dataset: AgriFieldNet) -> None:
+        ds = AgriFieldNet(dataset.paths, shared_cache=2**20)
+        ds[ds.bounds]
+        # The shared cache only travels to DataLoader workers
+        ds2 = pickle.loads(pickle.dumps(ds))
+        assert ds2._sample_store is None
+        x = ds2[ds2.bounds]
+        assert isinstance(x['image'], torch.Tensor)
 
     def test_and(self, dataset: AgriFieldNet) -> None:
         ds = dataset & dataset
@@ -51,8 +339,10 @@ class TestAgriFieldNet:
 
     def test_plot(self, dataset: AgriFieldNet) -> None:
         x = dataset[dataset.bounds]
+        image = x['image'].clone()
         dataset.plot(x, suptitle='Test')
         plt.close()
+        assert torch.equal(x['image'], image)
 
     def test_plot_prediction(self, dataset: AgriFieldNet) -> None:
         x = dataset[dataset.bounds]
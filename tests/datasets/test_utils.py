@@ -2,6 +2,7 @@
 # Licensed under the MIT License.
 
 import builtins
+import copy
 import glob
 import math
 import os
@@ -10,6 +11,7 @@ import re
 import shutil
 import sys
 from datetime import datetime
+from multiprocessing.shared_memory import SharedMemory
 from pathlib import Path
 from typing import Any
 
@@ -24,6 +26,7 @@ import torchgeo.datasets.utils
 from torchgeo.datasets.utils import (
     BoundingBox,
     DatasetNotFoundError,
+    _SampleStore,
     array_to_tensor,
     concat_samples,
     disambiguate_timestamp,
@@ -673,3 +676,94 @@ def test_array_to_tensor(array_dtype: 'np.typing.DTypeLike') -> None:
     # values equal even if they differ.
     assert array[0].item() == tensor[0].item()
     assert array[1].item() == tensor[1].item()
+
+
+class TestSampleStore:
+    def test_lru(self) -> None:
+        store = _SampleStore(max_bytes=250)
+        a = np.arange(100, dtype=np.uint8)
+        store.put('a', (a,))
+        store.put('b', (a,))
+        assert store.get('a') is not None
+        store.put('c', (a,))
+        assert store.get('b') is None
+        assert store.get('a') is not None
+        store.put('d', (np.zeros(300, dtype=np.uint8),))
+        assert store.get('d') is None
+        assert len(store) == 2
+        store.clear()
+        assert len(store) == 0
+        store.close()
+
+    def test_arrays(self) -> None:
+        store = _SampleStore(max_bytes=2**10)
+        image = np.arange(24, dtype=np.float32).reshape(2, 3, 4)
+        mask = np.arange(12).reshape(3, 4)[:, ::2]
+        store.put('a', (image, mask))
+        arrays = store.get('a')
+        assert arrays is not None
+        assert arrays[0].dtype == image.dtype
+        assert arrays[1].dtype == mask.dtype
+        assert np.array_equal(arrays[0], image)
+        assert np.array_equal(arrays[1], mask)
+        arrays[0][:] = 0
+        arrays = store.get('a')
+        assert arrays is not None
+        assert np.array_equal(arrays[0], image)
+        store.close()
+
+    def test_fragmented(self) -> None:
+        store = _SampleStore(max_bytes=300)
+        a = np.zeros(80, dtype=np.uint8)
+        for key in 'abc':
+            store.put(key, (a,))
+        store.get('a')
+        store.get('c')
+        # Fits in the gap left by evicting b, a and c are kept
+        store.put('d', (a,))
+        assert store.get('b') is None
+        assert len(store) == 3
+
+    def test_max_entries(self) -> None:
+        store = _SampleStore(max_bytes=2**10, max_entries=2)
+        a = np.zeros(1)
+        for key in 'abc':
+            store.put(key, (a,))
+        assert store.get('a') is None
+        assert len(store) == 2
+
+    def test_close(self) -> None:
+        store = _SampleStore(max_bytes=2**10)
+        name = store._arena.name
+        store.close()
+        with pytest.raises(FileNotFoundError):
+            SharedMemory(name=name)
+        with pytest.raises(ValueError, match='closed'):
+            store.get('a')
+        with pytest.raises(ValueError, match='closed'):
+            store.put('a', (np.zeros(1),))
+        store.close()
+
+    def test_unused(self) -> None:
+        store = _SampleStore(max_bytes=2**10)
+        name = store._arena.name
+        del store
+        with pytest.raises(FileNotFoundError):
+            SharedMemory(name=name)
+
+    def test_deepcopy(self) -> None:
+        store = _SampleStore(max_bytes=2**10)
+        assert copy.deepcopy(store) is store
+        store.close()
+
+    def test_pickle(self) -> None:
+        store = _SampleStore(max_bytes=2**10)
+        assert pickle.loads(pickle.dumps(store)) is None
+        store.close()
+
+    @pytest.mark.skipif(not os.path.isdir('/dev/shm'), reason='requires /dev/shm')
+    def test_too_large(self, monkeypatch: MonkeyPatch) -> None:
+        usage = shutil.disk_usage('/dev/shm')._replace(free=2**20)
+        monkeypatch.setattr(shutil, 'disk_usage', lambda path: usage)
+        with pytest.raises(ValueError, match='does not fit in /dev/shm'):
+            _SampleStore(max_bytes=2**20)
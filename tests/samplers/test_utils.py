@@ -4,9 +4,14 @@
 import math
 
 import pytest
+import torch
 
 from torchgeo.datasets import BoundingBox
-from torchgeo.samplers import tile_to_chips
+from torchgeo.samplers import (
+    get_random_bounding_box,
+    get_random_bounding_boxes,
+    tile_to_chips,
+)
 from torchgeo.samplers.utils import _to_tuple
 
 MAYBE_TUPLE = float | tuple[float, float]
@@ -42,3 +47,36 @@ def test_tile_to_chips(
     rows, cols = tile_to_chips(bounds, size, stride)
     assert math.isclose(rows, expected[0])
     assert math.isclose(cols, expected[1])
+
+
+def test_get_random_bounding_boxes() -> None:
+    bounds = BoundingBox(0, 10, 20, 30, 40, 50)
+    queries = get_random_bounding_boxes(bounds, (2, 3), 0.5, 16)
+    assert len(queries) == 16
+    for query in queries:
+        assert query in bounds
+        assert math.isclose(query.maxx - query.minx, 3)
+        assert math.isclose(query.maxy - query.miny, 2)
+        assert (query.minx / 0.5).is_integer()
+        assert (query.miny / 0.5).is_integer()
+
+
+def test_get_random_bounding_boxes_matches_single() -> None:
+    bounds = BoundingBox(0, 10, 20, 30, 40, 50)
+    torch.manual_seed(0)
+    expected = [get_random_bounding_box(bounds, 2, 0.5) for _ in range(4)]
+    torch.manual_seed(0)
+    assert get_random_bounding_boxes(bounds, 2, 0.5, 4) == expected
+
+
+def test_get_random_bounding_boxes_reaches_edges() -> None:
+    bounds = BoundingBox(0, 3, 0, 3, 0, 1)
+    queries = get_random_bounding_boxes(bounds, 2, 1, 100)
+    assert {query.minx for query in queries} == {0, 1}
+    assert {query.miny for query in queries} == {0, 1}
+
+
+def test_get_random_bounding_boxes_small_bounds() -> None:
+    bounds = BoundingBox(0, 3, 0, 3, 0, 1)
+    queries = get_random_bounding_boxes(bounds, 5, 1, 10)
+    assert all(query.minx == 0 and query.miny == 0 for query in queries)
@@ -3,19 +3,40 @@
 
 """AgriFieldNet India Challenge dataset."""
 
+import functools
+import json
 import os
-import re
 from collections.abc import Callable, Iterable, Sequence
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, cast
 
 import matplotlib.pyplot as plt
+import numpy as np
+import rasterio
 import torch
 from matplotlib.figure import Figure
 from rasterio.crs import CRS
+from rasterio.vrt import WarpedVRT
 from torch import Tensor
 
 from .geo import RasterDataset
-from .utils import BoundingBox, RGBBandsMissingError
+from .utils import BoundingBox, RGBBandsMissingError, _SampleStore
+
+
+def _split_path(filepath: str) -> tuple[str, str]:
+    """Split a filepath into its directory and filename.
+
+    Faster than :func:`os.path.dirname` and :func:`os.path.basename` for paths
+    produced by the dataset itself, which always use :data:`os.sep`.
+
+    Args:
+        filepath: path to split
+
+    Returns:
+        directory (including the trailing separator, if any) and filename
+    """
+    i = filepath.rfind(os.sep) + 1
+    return filepath[:i], filepath[i:]
 
 
 class AgriFieldNet(RasterDataset):
@@ -69,15 +90,34 @@ class AgriFieldNet(RasterDataset):
 
     * https://doi.org/10.34911/rdnt.wu92p1
 
+    Bands are read in parallel using a thread pool. The number of threads can be
+    controlled with the ``TORCHGEO_NUM_THREADS`` environment variable, which follows
+    the same semantics as ``GDAL_NUM_THREADS``.
+
+    With ``cache_labels=True``, the list of labels and their extents is cached in
+    :attr:`label_cache_filename` in each root directory so that later instances can
+    skip scanning the label tree. The cache is rebuilt when a file is added to or
+    removed from any directory under ``train_labels``. Call :meth:`_rebuild_cache`
+    after modifying label files in place.
+
+    Samples are returned as CPU tensors. When training on a GPU, use
+    ``DataLoader(..., pin_memory=True)`` and move batches with
+    ``.to(device, non_blocking=True)`` so that host-to-device copies overlap with
+    compute.
+
     .. versionadded:: 0.6
     """
 
+    filename_glob = 'ref_agrifieldnet_competition_v1_source_*_{}_10m.*'
     filename_regex = r"""
         ^ref_agrifieldnet_competition_v1_source_
         (?P<unique_folder_id>[a-z0-9]{5})
         _(?P<band>B[0-9A-Z]{2})_10m
     """
 
+    #: Name of the file used to cache label metadata in each root directory
+    label_cache_filename = '.torchgeo_agrifieldnet_cache.json'
+
     rgb_bands = ['B04', 'B03', 'B02']
     all_bands = [
         'B01',
@@ -119,6 +159,10 @@ class AgriFieldNet(RasterDataset):
         bands: Sequence[str] = all_bands,
         transforms: Callable[[dict[str, Tensor]], dict[str, Tensor]] | None = None,
         cache: bool = True,
+        dtype: torch.dtype = torch.float32,
+        shared_cache: int | None = None,
+        cache_samples: bool = False,
+        cache_labels: bool = False,
     ) -> None:
         """Initialize a new AgriFieldNet dataset instance.
 
@@ -132,6 +176,23 @@ class AgriFieldNet(RasterDataset):
             transforms: a function/transform that takes input sample and its target as
                 entry and returns a transformed version
             cache: if True, cache the dataset in memory
+            dtype: dtype of the returned image, use ``torch.bfloat16`` or
+                ``torch.float16`` to halve the memory and host-to-device bandwidth
+                of mixed precision pipelines. The cast is applied to the raw
+                reflectance values before *transforms*, so it is lossy: values
+                around 3000 are rounded to multiples of 16 in ``torch.bfloat16``
+                and of 2 in ``torch.float16``. If this precision matters, keep the
+                default and cast after normalizing in *transforms* instead
+            shared_cache: maximum size in bytes of a cache of decoded samples shared
+                by all DataLoader workers (e.g., ``2 * 1024**3``), disabled if None,
+                allocated up front in shared memory and freed by :meth:`close`. On
+                Linux this must fit in ``/dev/shm``, which is only 64 MB in Docker
+                containers unless started with ``--shm-size``
+            cache_samples: if True, keep the most recently loaded samples in memory,
+                useful for samplers that revisit the same queries, such as
+                :class:`~torchgeo.samplers.GridGeoSampler` over several epochs
+            cache_labels: if True, store the list of labels and their extents in
+                :attr:`label_cache_filename` in each root directory
 
         Raises:
             DatasetNotFoundError: If dataset is not found.
@@ -143,9 +204,16 @@ class AgriFieldNet(RasterDataset):
 
         self.paths = paths
         self.classes = classes
-        self.ordinal_map = torch.zeros(max(self.cmap.keys()) + 1, dtype=self.dtype)
+        self._dtype = dtype
+        self.cache_samples = cache_samples
+        self.cache_labels = cache_labels
+        self.ordinal_map = torch.zeros(max(self.cmap.keys()) + 1, dtype=torch.long)
         self.ordinal_cmap = torch.zeros((len(self.classes), 4), dtype=torch.uint8)
 
+        # Only index a single band, the others are found by replacing its token
+        self.filename_glob = self.filename_glob.format(bands[0])
+        self._ref_band_token = f'_{bands[0]}_10m'
+
         super().__init__(
             paths=paths, crs=crs, bands=bands, transforms=transforms, cache=cache
         )
@@ -155,58 +223,251 @@ class AgriFieldNet(RasterDataset):
             self.ordinal_map[k] = v
             self.ordinal_cmap[v] = torch.tensor(self.cmap[k])
 
-    def __getitem__(self, query: BoundingBox) -> dict[str, Any]:
-        """Return an index within the dataset.
+        # Used for plotting, None if any of the RGB bands is missing
+        self._rgb_indices: list[int] | None = None
+        if set(self.rgb_bands) <= set(self.bands):
+            self._rgb_indices = [self.bands.index(band) for band in self.rgb_bands]
+
+        # The label tree does not change between samples, so only walk it once
+        self._load_labels()
+
+        # Bands are stored in separate files, so they can be read concurrently.
+        # GDAL releases the GIL while decoding, so threads are sufficient.
+        self._num_threads = self._get_num_threads()
+        self._io_pool: ThreadPoolExecutor | None = None
+        self._io_pool_pid: int | None = None
+
+        # Workers each get a copy of the dataset, so share decoded samples through
+        # shared memory to avoid reading the same tiles in every worker
+        self._sample_store: _SampleStore | None = None
+        if shared_cache is not None:
+            self._sample_store = _SampleStore(shared_cache)
+
+    @property
+    def dtype(self) -> torch.dtype:
+        """The dtype of the returned image.
+
+        Returns:
+            the dtype of the dataset
+        """
+        return self._dtype
+
+    def __getstate__(self) -> tuple[dict[str, Any], list[tuple[Any, Any, Any | None]]]:
+        """Define how instances are pickled.
+
+        Returns:
+            the state necessary to unpickle the instance
+        """
+        attrs, tuples = super().__getstate__()
+        # Thread pools cannot be pickled, each process creates its own
+        attrs = attrs | {'_io_pool': None}
+        return attrs, tuples
+
+    def close(self) -> None:
+        """Release the thread pool and the shared sample cache.
+
+        Deep copies of the dataset, e.g., the splits made by
+        :func:`~torchgeo.datasets.random_bbox_assignment`, share the cache, which is
+        freed once none of them in the process that created it still uses it. The
+        dataset remains usable, without the shared cache.
+        """
+        if self._io_pool is not None:
+            self._io_pool.shutdown()
+            self._io_pool = None
+        # Only drop this copy's reference, the cache frees itself once unused
+        self._sample_store = None
+
+    def _get_num_threads(self) -> int:
+        """Get the number of threads used to read bands in parallel.
+
+        Follows the semantics of ``GDAL_NUM_THREADS``: the ``TORCHGEO_NUM_THREADS``
+        environment variable may be set to an integer or to ``ALL_CPUS``. Set it to 1
+        to disable threading, e.g., when already using many DataLoader workers.
+
+        Returns:
+            the number of threads to use (defaults to one per band, capped at the
+            number of CPUs)
+        """
+        cpus = os.cpu_count() or 1
+        value = os.environ.get('TORCHGEO_NUM_THREADS')
+        if value is None:
+            num_threads = min(len(self.bands), cpus)
+        elif value.upper() == 'ALL_CPUS':
+            num_threads = cpus
+        else:
+            num_threads = int(value)
+        return max(num_threads, 1)
+
+    def _rebuild_cache(self) -> None:
+        """Rebuild the label metadata cache.
+
+        Call this after adding, removing, or modifying label files in place.
+        """
+        self._load_labels(rebuild=True)
+        # Cached samples may contain masks from the old labels
+        self._cached_load_query.cache_clear()
+        if self._sample_store is not None:
+            self._sample_store.clear()
+
+    def _load_labels(self, rebuild: bool = False) -> None:
+        """Find all crop type labels and their spatial extent.
+
+        Walking the label tree and opening every label is slow, so if
+        :attr:`cache_labels` is True, the results are stored in
+        :attr:`label_cache_filename` in each root directory and reused until any
+        directory under ``train_labels`` changes.
 
         Args:
-            query: (minx, maxx, miny, maxy, mint, maxt) coordinates to index
+            rebuild: if True, ignore any existing cache
+        """
+        paths = [self.paths] if isinstance(self.paths, str) else self.paths
+        mask_filepaths: list[str] = []
+        mask_bounds: list[list[float]] = []
+        for path in paths:
+            label_dir = os.path.join(path, 'train_labels')
+            cache_path = os.path.join(path, self.label_cache_filename)
+
+            metadata = None
+            if self.cache_labels and not rebuild:
+                metadata = self._read_label_cache(cache_path, path)
+
+            if metadata is None:
+                filepaths, mtimes = self._find_mask_filepaths(label_dir)
+                metadata = {
+                    'crs': self.crs.to_wkt(),
+                    'directories': {
+                        os.path.relpath(d, path): mtime for d, mtime in mtimes.items()
+                    },
+                    'mask_filepaths': [os.path.relpath(fp, path) for fp in filepaths],
+                    'bboxes': self._load_mask_bounds(filepaths).tolist(),
+                }
+                if self.cache_labels and mtimes:
+                    self._write_label_cache(cache_path, metadata)
+
+            for filepath in metadata['mask_filepaths']:
+                mask_filepaths.append(os.path.join(path, filepath))
+            mask_bounds.extend(metadata['bboxes'])
+
+        self._mask_filepaths = mask_filepaths
+        self._mask_bounds = np.array(mask_bounds, dtype=np.float64).reshape(-1, 4)
+
+    def _read_label_cache(self, cache_path: str, root: str) -> Any:
+        """Read cached label metadata.
+
+        Args:
+            cache_path: path of the cache file
+            root: root directory that the cached paths are relative to
 
         Returns:
-            data, label, and field ids at that index
+            the cached metadata, or None if the cache is missing or stale
         """
-        assert isinstance(self.paths, str)
+        try:
+            with open(cache_path) as f:
+                metadata = json.load(f)
+            # Adding or removing a file changes the mtime of its parent directory
+            for directory, mtime in metadata['directories'].items():
+                if os.stat(os.path.join(root, directory)).st_mtime_ns != mtime:
+                    return None
+        except (OSError, ValueError, KeyError):
+            return None
 
-        hits = self.index.intersection(tuple(query), objects=True)
-        filepaths = cast(list[str], [hit.object for hit in hits])
+        # Bounds are stored in the CRS of the dataset
+        if metadata.get('crs') != self.crs.to_wkt():
+            return None
 
-        if not filepaths:
-            raise IndexError(
-                f'query: {query} not found in index with bounds: {self.bounds}'
-            )
+        return metadata
 
-        data_list: list[Tensor] = []
-        filename_regex = re.compile(self.filename_regex, re.VERBOSE)
-        for band in self.bands:
-            band_filepaths = []
-            for filepath in filepaths:
-                filename = os.path.basename(filepath)
-                directory = os.path.dirname(filepath)
-                match = re.match(filename_regex, filename)
-                if match:
-                    if 'band' in match.groupdict():
-                        start = match.start('band')
-                        end = match.end('band')
-                        filename = filename[:start] + band + filename[end:]
-                filepath = os.path.join(directory, filename)
-                band_filepaths.append(filepath)
-            data_list.append(self._merge_files(band_filepaths, query))
-        image = torch.cat(data_list)
+    def _write_label_cache(self, cache_path: str, metadata: dict[str, Any]) -> None:
+        """Write label metadata to the cache.
+
+        Args:
+            cache_path: path of the cache file
+            metadata: label metadata to cache
+        """
+        # Write to a temporary file first so that concurrent readers never see a
+        # partially written cache. Read-only datasets simply aren't cached.
+        tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(metadata, f)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _find_mask_filepaths(self, label_dir: str) -> tuple[list[str], dict[str, int]]:
+        """Find all crop type label files.
+
+        Args:
+            label_dir: directory to search
+
+        Returns:
+            list of paths to crop type masks, excluding field id masks, and the
+            modification time in nanoseconds of each directory searched
+        """
+        if not os.path.isdir(label_dir):
+            return [], {}
 
+        # os.scandir avoids the extra stat calls that os.walk makes per entry
         mask_filepaths = []
-        for root, dirs, files in os.walk(os.path.join(self.paths, 'train_labels')):
-            for file in files:
-                if not file.endswith('_field_ids.tif') and file.endswith('.tif'):
-                    file_path = os.path.join(root, file)
-                    mask_filepaths.append(file_path)
+        mtimes = {}
+        stack = [label_dir]
+        while stack:
+            directory = stack.pop()
+            # Record the mtime before scanning so that concurrent changes are seen
+            # as stale by the next reader
+            mtimes[directory] = os.stat(directory).st_mtime_ns
+            with os.scandir(directory) as it:
+                for entry in it:
+                    name = entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif name.endswith('.tif') and not name.endswith('_field_ids.tif'):
+                        mask_filepaths.append(entry.path)
+        return mask_filepaths, mtimes
+
+    def _load_mask_bounds(
+        self, filepaths: Sequence[str]
+    ) -> 'np.typing.NDArray[np.float64]':
+        """Load the spatial extent of each crop type label file.
 
-        mask = self._merge_files(mask_filepaths, query)
-        mask = self.ordinal_map[mask.squeeze().long()]
+        Args:
+            filepaths: crop type masks to load
+
+        Returns:
+            (minx, maxx, miny, maxy) of each mask in the CRS of the dataset
+        """
+        bounds = np.empty((len(filepaths), 4))
+        for i, filepath in enumerate(filepaths):
+            with rasterio.open(filepath) as src, WarpedVRT(src, crs=self.crs) as vrt:
+                minx, miny, maxx, maxy = vrt.bounds
+            bounds[i] = (minx, maxx, miny, maxy)
+        return bounds
+
+    def __getitem__(self, query: BoundingBox) -> dict[str, Any]:
+        """Return an index within the dataset.
+
+        Args:
+            query: (minx, maxx, miny, maxy, mint, maxt) coordinates to index
+
+        Returns:
+            data, label, and field ids at that index
+        """
+        if self._sample_store is not None:
+            image, mask = self._shared_load_query(query)
+        elif self.cache_samples:
+            image, mask = self._cached_load_query(query)
+            # Cached tensors are shared, don't let transforms modify them in place.
+            # The image is copied by the cast below, even if the dtype matches.
+            mask = mask.clone()
+        else:
+            image, mask = self._load_query(query)
 
         sample = {
             'crs': self.crs,
             'bbox': query,
-            'image': image.float(),
-            'mask': mask.long(),
+            'image': image.to(self.dtype, copy=self.cache_samples),
+            'mask': mask,
         }
 
         if self.transforms is not None:
@@ -214,6 +475,107 @@ class AgriFieldNet(RasterDataset):
 
         return sample
 
+    def _shared_load_query(self, query: BoundingBox) -> tuple[Tensor, Tensor]:
+        """Version of :meth:`_load_query` cached across DataLoader workers.
+
+        Args:
+            query: (minx, maxx, miny, maxy, mint, maxt) coordinates to index
+
+        Returns:
+            image and mask at that index
+        """
+        store = cast(_SampleStore, self._sample_store)
+        arrays = store.get(query)
+        if arrays is not None:
+            return torch.from_numpy(arrays[0]), torch.from_numpy(arrays[1])
+
+        image, mask = self._load_query(query)
+        store.put(query, (image.numpy(), mask.numpy()))
+        return image, mask
+
+    @functools.lru_cache(maxsize=32)
+    def _cached_load_query(self, query: BoundingBox) -> tuple[Tensor, Tensor]:
+        """Cached version of :meth:`_load_query`.
+
+        Args:
+            query: (minx, maxx, miny, maxy, mint, maxt) coordinates to index
+
+        Returns:
+            image and mask at that index
+        """
+        return self._load_query(query)
+
+    def _load_query(self, query: BoundingBox) -> tuple[Tensor, Tensor]:
+        """Load the image and mask for a query.
+
+        Args:
+            query: (minx, maxx, miny, maxy, mint, maxt) coordinates to index
+
+        Returns:
+            image and mask at that index
+
+        Raises:
+            IndexError: if query is not found in the index
+        """
+        # The index is already an R-tree, fetch the stored filepaths directly
+        # rather than wrapping every hit in an Item
+        filepaths = cast(
+            list[str], list(self.index.intersection(tuple(query), objects='raw'))
+        )
+
+        if not filepaths:
+            raise IndexError(
+                f'query: {query} not found in index with bounds: {self.bounds}'
+            )
+
+        band_filepaths: dict[str, list[str]] = {band: [] for band in self.bands}
+        for filepath in filepaths:
+            directory, filename = _split_path(filepath)
+            for band in self.bands:
+                band_filename = filename.replace(
+                    self._ref_band_token, f'_{band}_10m', 1
+                )
+                band_filepaths[band].append(directory + band_filename)
+
+        if self._num_threads > 1:
+            # Threads do not survive a fork, so forked DataLoader workers must not
+            # reuse a pool created by the parent process
+            if self._io_pool is None or self._io_pool_pid != os.getpid():
+                self._io_pool = ThreadPoolExecutor(max_workers=self._num_threads)
+                self._io_pool_pid = os.getpid()
+            futures = [
+                self._io_pool.submit(self._merge_files, band_filepaths[b], query)
+                for b in self.bands
+            ]
+            data_list = [future.result() for future in futures]
+        else:
+            data_list = [
+                self._merge_files(band_filepaths[b], query) for b in self.bands
+            ]
+        image = torch.cat(data_list)
+
+        # Only merge the label tiles that overlap with the query
+        minx, maxx, miny, maxy = self._mask_bounds.T
+        hits = np.flatnonzero(
+            (minx <= query.maxx)
+            & (maxx >= query.minx)
+            & (miny <= query.maxy)
+            & (maxy >= query.miny)
+        )
+        if len(hits) > 0:
+            mask_filepaths = [self._mask_filepaths[i] for i in hits]
+            mask = self._merge_files(mask_filepaths, query)
+        else:
+            mask = torch.zeros(1, *image.shape[-2:], dtype=torch.int32)
+
+        # index_select accepts int32 indices, so avoid an int64 copy of the mask
+        mask = mask.squeeze()
+        if mask.dtype not in (torch.int32, torch.int64):
+            mask = mask.int()
+        mask = self.ordinal_map.index_select(0, mask.flatten()).view(mask.shape)
+
+        return image, mask
+
     def plot(
         self,
         sample: dict[str, Tensor],
@@ -233,15 +595,13 @@ class AgriFieldNet(RasterDataset):
         Raises:
             RGBBandsMissingError: If *bands* does not include all RGB bands.
         """
-        rgb_indices = []
-        for band in self.rgb_bands:
-            if band in self.bands:
-                rgb_indices.append(self.bands.index(band))
-            else:
-                raise RGBBandsMissingError()
-
-        image = sample['image'][rgb_indices].permute(1, 2, 0)
-        image = (image - image.min()) / (image.max() - image.min())
+        if self._rgb_indices is None:
+            raise RGBBandsMissingError()
+
+        # Indexing already returns a copy, so normalize it in place
+        image = sample['image'][self._rgb_indices].float().permute(1, 2, 0)
+        vmin, vmax = torch.aminmax(image)
+        image = image.sub_(vmin).div_(vmax - vmin)
 
         mask = sample['mask'].squeeze()
         ncols = 2
@@ -10,14 +10,22 @@ import bz2
 import collections
 import contextlib
 import gzip
+import hashlib
+import json
 import lzma
+import multiprocessing
 import os
+import pickle
+import shutil
 import sys
 import tarfile
-from collections.abc import Iterable, Iterator, Sequence
+import weakref
+from collections.abc import Hashable, Iterable, Iterator, Sequence
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Any, cast, overload
+from multiprocessing.context import get_spawning_popen
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, SupportsIndex, cast, overload
 
 import numpy as np
 import rasterio
@@ -847,3 +855,286 @@ def array_to_tensor(array: np.typing.NDArray[Any]) -> Tensor:
     elif array.dtype == np.uint32:
         array = array.astype(np.int64)
     return torch.tensor(array)
+
+
+class _SampleStore:
+    """Least recently used cache of arrays in shared memory.
+
+    Entries are allocated first fit in a single shared memory arena and described
+    by a table in a second segment, so all DataLoader workers of a dataset read and
+    fill the same cache without copying samples through a server process. Both
+    segments are created up front by the process that creates the store. They are
+    freed when it calls :meth:`close` or drops its last reference to the store.
+
+    Deep copies share the store. Pickled copies only share it while starting a
+    DataLoader worker, otherwise they are unpickled as None.
+    """
+
+    #: Layout of the table entry describing each cached sample
+    _entry_dtype = np.dtype(
+        [
+            ('key', '<u8'),
+            ('offset', '<i8'),
+            ('nbytes', '<i8'),
+            ('header_nbytes', '<i8'),
+            ('tick', '<i8'),
+        ]
+    )
+
+    def __init__(self, max_bytes: int, max_entries: int = 1024) -> None:
+        """Initialize a new _SampleStore instance.
+
+        Args:
+            max_bytes: maximum total size of the cached samples
+            max_entries: maximum number of cached samples
+        """
+        table_nbytes = 8 + max_entries * self._entry_dtype.itemsize
+        # On Linux, shared memory lives in a tmpfs that is often small in containers
+        # (64 MB in Docker by default), and writing past its end raises SIGBUS
+        if os.path.isdir('/dev/shm'):
+            free = shutil.disk_usage('/dev/shm').free
+            if max_bytes + table_nbytes > free:
+                raise ValueError(
+                    f'A shared cache of {max_bytes} bytes does not fit in /dev/shm, '
+                    f'which has {free} bytes free'
+                )
+
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        # Locks from the fork context can't be passed to spawned workers, while
+        # locks from the spawn context work with every start method
+        self._lock = multiprocessing.get_context('spawn').Lock()
+        # SharedMemory cannot create empty segments
+        self._arena = SharedMemory(create=True, size=max(max_bytes, 1))
+        self._table = SharedMemory(create=True, size=table_nbytes)
+        self._finalizer = weakref.finalize(
+            self, _SampleStore._release, self._arena, self._table, os.getpid()
+        )
+
+    def __reduce_ex__(self, protocol: SupportsIndex) -> str | tuple[Any, ...]:
+        """Define how instances are pickled.
+
+        Args:
+            protocol: pickle protocol version
+
+        Returns:
+            instructions to unpickle the instance
+        """
+        # The lock can only be shared between processes through inheritance
+        if get_spawning_popen() is None:
+            return type(None), ()
+        return super().__reduce_ex__(protocol)
+
+    def __getstate__(self) -> dict[str, Any]:
+        """Define how instances are pickled.
+
+        Only used while starting spawned DataLoader workers.
+
+        Returns:
+            the state necessary to unpickle the instance
+        """
+        return {
+            'max_bytes': self.max_bytes,
+            'max_entries': self.max_entries,
+            '_lock': self._lock,
+            'names': (self._arena.name, self._table.name),
+        }
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        """Define how to unpickle an instance.
+
+        Args:
+            state: the state of the instance when it was pickled
+        """
+        names = state.pop('names')
+        self.__dict__.update(state)
+        # Workers share the resource tracker of the process that created the
+        # store, which ignores segments that are registered twice
+        self._arena, self._table = (SharedMemory(name=name) for name in names)
+        # Only the process that created the store may unlink it
+        self._finalizer = weakref.finalize(
+            self, _SampleStore._release, self._arena, self._table, None
+        )
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> _SampleStore:
+        """Share the store with copies of the dataset.
+
+        Args:
+            memo: objects already copied
+
+        Returns:
+            this instance
+        """
+        return self
+
+    def __len__(self) -> int:
+        """Return the number of cached samples.
+
+        Returns:
+            number of cached samples
+        """
+        with self._lock:
+            _, entries = self._views()
+            return int(np.count_nonzero(entries['key']))
+
+    @staticmethod
+    def _release(arena: SharedMemory, table: SharedMemory, owner: int | None) -> None:
+        """Close the segments, and unlink them in the process that created them.
+
+        Args:
+            arena: segment containing the samples
+            table: segment describing the samples
+            owner: id of the process that created the segments
+        """
+        for shm in (arena, table):
+            shm.close()
+            if os.getpid() == owner:
+                shm.unlink()
+
+    def _views(self) -> tuple[np.typing.NDArray[np.int64], np.typing.NDArray[Any]]:
+        """Create views of the table.
+
+        The views must not outlive the caller, a segment can't be closed while
+        they exist.
+
+        Returns:
+            the clock used to track usage and the table entries
+
+        Raises:
+            ValueError: If the store is closed.
+        """
+        # numpy would silently allocate new memory instead
+        if self._table.buf is None or self._arena.buf is None:
+            raise ValueError('Operation on a closed shared cache')
+        clock = np.ndarray((1,), np.int64, buffer=self._table.buf)
+        entries = np.ndarray(
+            (self.max_entries,), self._entry_dtype, buffer=self._table.buf, offset=8
+        )
+        return clock, entries
+
+    @staticmethod
+    def _digest(key: Hashable) -> int:
+        """Hash a key consistently across processes.
+
+        Args:
+            key: key of the sample
+
+        Returns:
+            a non-zero 64-bit digest, zero marks unused entries
+        """
+        digest = hashlib.blake2b(pickle.dumps(key), digest_size=8).digest()
+        return max(int.from_bytes(digest, 'little'), 1)
+
+    def _allocate(self, entries: np.typing.NDArray[Any], nbytes: int) -> int:
+        """Find room for a sample, evicting the least recently used samples if needed.
+
+        Args:
+            entries: the table entries
+            nbytes: size of the sample
+
+        Returns:
+            offset of the sample in the arena
+        """
+        while True:
+            used = entries[entries['key'] != 0]
+            if len(used) < self.max_entries:
+                used = used[np.argsort(used['offset'])]
+                starts = np.append(used['offset'], self.max_bytes)
+                ends = np.insert(used['offset'] + used['nbytes'], 0, 0)
+                gaps = np.flatnonzero(starts - ends >= nbytes)
+                if len(gaps):
+                    return int(ends[gaps[0]])
+
+            live = np.flatnonzero(entries['key'])
+            entries['key'][live[np.argmin(entries['tick'][live])]] = 0
+
+    def get(self, key: Hashable) -> tuple[np.typing.NDArray[Any], ...] | None:
+        """Look up a sample.
+
+        Args:
+            key: key of the sample
+
+        Returns:
+            copies of the cached arrays, or None if the sample is not cached
+
+        Raises:
+            ValueError: If the store is closed.
+        """
+        digest = self._digest(key)
+        with self._lock:
+            clock, entries = self._views()
+            (found,) = np.nonzero(entries['key'] == digest)
+            if not len(found):
+                return None
+
+            entry = entries[found[0]]
+            clock += 1
+            entry['tick'] = clock[0]
+            data = np.ndarray(
+                (entry['nbytes'],),
+                np.uint8,
+                buffer=self._arena.buf,
+                offset=entry['offset'],
+            )
+            pos = int(entry['header_nbytes'])
+            arrays = []
+            for dtype, shape in json.loads(data[:pos].tobytes()):
+                array = np.empty(shape, dtype)
+                array.reshape(-1).view(np.uint8)[:] = data[pos : pos + array.nbytes]
+                arrays.append(array)
+                pos += array.nbytes
+            return tuple(arrays)
+
+    def put(self, key: Hashable, arrays: tuple[np.typing.NDArray[Any], ...]) -> None:
+        """Add a sample, evicting the least recently used samples if needed.
+
+        Args:
+            key: key of the sample
+            arrays: arrays to cache
+
+        Raises:
+            ValueError: If the store is closed.
+        """
+        header = json.dumps([(a.dtype.str, a.shape) for a in arrays]).encode()
+        nbytes = len(header) + sum(array.nbytes for array in arrays)
+        if nbytes > self.max_bytes:
+            return
+
+        digest = self._digest(key)
+        with self._lock:
+            clock, entries = self._views()
+            if (entries['key'] == digest).any():
+                return
+
+            offset = self._allocate(entries, nbytes)
+            data = np.ndarray(
+                (nbytes,), np.uint8, buffer=self._arena.buf, offset=offset
+            )
+            data[: len(header)] = np.frombuffer(header, np.uint8)
+            pos = len(header)
+            for array in arrays:
+                array = np.ascontiguousarray(array)
+                data[pos : pos + array.nbytes] = array.reshape(-1).view(np.uint8)
+                pos += array.nbytes
+
+            clock += 1
+            entry = entries[np.flatnonzero(entries['key'] == 0)[0]]
+            entry['offset'] = offset
+            entry['nbytes'] = nbytes
+            entry['header_nbytes'] = len(header)
+            entry['tick'] = clock[0]
+            entry['key'] = digest
+
+    def clear(self) -> None:
+        """Remove all samples."""
+        with self._lock:
+            _, entries = self._views()
+            entries['key'] = 0
+
+    def close(self) -> None:
+        """Release the shared memory.
+
+        The store can no longer be used by this process. When called by the
+        process that created the store, the memory is freed for all processes.
+        """
+        self._finalizer()
@@ -6,7 +6,7 @@
 from .batch import BatchGeoSampler, RandomBatchGeoSampler
 from .constants import Units
 from .single import GeoSampler, GridGeoSampler, PreChippedGeoSampler, RandomGeoSampler
-from .utils import get_random_bounding_box, tile_to_chips
+from .utils import get_random_bounding_box, get_random_bounding_boxes, tile_to_chips
 
 __all__ = (
     # Samplers
@@ -20,6 +20,7 @@ __all__ = (
     'BatchGeoSampler',
     # Utilities
     'get_random_bounding_box',
+    'get_random_bounding_boxes',
     'tile_to_chips',
     # Constants
     'Units',
@@ -12,7 +12,7 @@ from torch.utils.data import Sampler
 
 from ..datasets import BoundingBox, GeoDataset
 from .constants import Units
-from .utils import _to_tuple, get_random_bounding_box, tile_to_chips
+from .utils import _to_tuple, get_random_bounding_boxes, tile_to_chips
 
 
 class BatchGeoSampler(Sampler[list[BoundingBox]], abc.ABC):
@@ -86,6 +86,10 @@ class RandomBatchGeoSampler(BatchGeoSampler):
         .. versionchanged:: 0.4
            ``length`` parameter is now optional, a reasonable default will be used
 
+        .. versionchanged:: 0.6
+           Patches are drawn with :func:`~torchgeo.samplers.get_random_bounding_boxes`,
+           so results for a fixed random seed differ from earlier versions
+
         Args:
             dataset: dataset to index from
             size: dimensions of each :term:`patch`
@@ -142,12 +146,9 @@ class RandomBatchGeoSampler(BatchGeoSampler):
             bounds = BoundingBox(*hit.bounds)
 
             # Choose random indices within that tile
-            batch = []
-            for _ in range(self.batch_size):
-                bounding_box = get_random_bounding_box(bounds, self.size, self.res)
-                batch.append(bounding_box)
-
-            yield batch
+            yield get_random_bounding_boxes(
+                bounds, self.size, self.res, self.batch_size
+            )
 
     def __len__(self) -> int:
         """Return the number of batches in a single epoch.
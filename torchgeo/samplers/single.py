@@ -88,6 +88,10 @@ class RandomGeoSampler(GeoSampler):
         .. versionchanged:: 0.4
            ``length`` parameter is now optional, a reasonable default will be used
 
+        .. versionchanged:: 0.6
+           Patches are drawn with :func:`~torchgeo.samplers.get_random_bounding_boxes`,
+           so results for a fixed random seed differ from earlier versions
+
         Args:
             dataset: dataset to index from
             size: dimensions of each :term:`patch`
@@ -28,7 +28,10 @@ def _to_tuple(value: tuple[float, float] | float) -> tuple[float, float]:
     Returns:
         value if value is a tuple, else (value, value)
     """
-    if isinstance(value, float | int):
+    # Fast path, samplers convert size and stride to tuples once in __init__
+    if type(value) is tuple:
+        return value
+    elif isinstance(value, float | int):
         return (value, value)
     else:
         return value
@@ -46,6 +49,11 @@ def get_random_bounding_box(
         * a ``tuple`` of two floats - in which case, the first *float* is used for the
           height dimension, and the second *float* for the width dimension
 
+    .. versionchanged:: 0.6
+       Offsets are drawn uniformly from every valid multiple of ``res``, including
+       the last one. Patches larger than *bounds* start at its minimum corner.
+       Results for a fixed random seed differ from earlier versions.
+
     Args:
         bounds: the larger bounding box to sample from
         size: the size of the bounding box to sample
@@ -54,27 +62,49 @@ def get_random_bounding_box(
     Returns:
         randomly sampled bounding box from the extent of the input
     """
-    t_size = _to_tuple(size)
+    return get_random_bounding_boxes(bounds, size, res, 1)[0]
 
-    # May be negative if bounding box is smaller than patch size
-    width = (bounds.maxx - bounds.minx - t_size[1]) / res
-    height = (bounds.maxy - bounds.miny - t_size[0]) / res
 
-    minx = bounds.minx
-    miny = bounds.miny
+def get_random_bounding_boxes(
+    bounds: BoundingBox, size: tuple[float, float] | float, res: float, n: int
+) -> list[BoundingBox]:
+    """Returns several random bounding boxes within a given bounding box.
 
-    # Use an integer multiple of res to avoid resampling
-    minx += int(torch.rand(1).item() * width) * res
-    miny += int(torch.rand(1).item() * height) * res
+    Equivalent to calling :func:`get_random_bounding_box` *n* times, but draws all
+    random numbers in a single call, which is much faster for large *n*.
+
+    Args:
+        bounds: the larger bounding box to sample from
+        size: the size of the bounding boxes to sample
+        res: the resolution of the image
+        n: the number of bounding boxes to sample
 
-    maxx = minx + t_size[1]
-    maxy = miny + t_size[0]
+    Returns:
+        randomly sampled bounding boxes from the extent of the input
 
-    mint = bounds.mint
-    maxt = bounds.maxt
+    .. versionadded:: 0.6
+    """
+    t_size = _to_tuple(size)
 
-    query = BoundingBox(minx, maxx, miny, maxy, mint, maxt)
-    return query
+    # Number of valid positions along each axis, at least 1 if bounding box is
+    # smaller than patch size
+    width = max(int((bounds.maxx - bounds.minx - t_size[1]) / res), 0) + 1
+    height = max(int((bounds.maxy - bounds.miny - t_size[0]) / res), 0) + 1
+
+    # Use an integer multiple of res to avoid resampling. A single integer draw
+    # per box selects a cell uniformly without float rounding bias.
+    cells = torch.randint(width * height, (n,)).tolist()
+
+    queries = []
+    for cell in cells:
+        y, x = divmod(cell, width)
+        minx = bounds.minx + x * res
+        miny = bounds.miny + y * res
+        maxx = minx + t_size[1]
+        maxy = miny + t_size[0]
+        queries.append(BoundingBox(minx, maxx, miny, maxy, bounds.mint, bounds.maxt))
+
+    return queries
 
 
 def tile_to_chips(